@@ -0,0 +1,181 @@
+import copy
+import cv2
+import itertools
+import json
+import time
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from frame_index import FrameIndex
+from ocr_reader import OCRReader
+from video_processor import VideoProcessor
+
+# 탐색할 설정 범위
+TUNE_ENGINES = ["easyocr", "tesseract"]
+TUNE_SCALES = [1, 2, 3, 4]
+TUNE_BLURS = [0, 3, 5]
+TUNE_THRESHOLDS = ["otsu", "adaptive", "none"]
+TUNE_SKIP_DETECTION = [False, True]  # EasyOCR에만 적용
+
+
+class AutoTuner:
+    """라벨이 있는 타임스탬프로 엔진/전처리 조합을 평가하여 목표 정확도를 만족하는 가장 빠른 설정 선택"""
+
+    def __init__(self, video_path: str, labels_path: str, config: Optional[Config] = None,
+                 target_accuracy: float = 0.95, engines: Optional[List[str]] = None):
+        self.video_path = video_path
+        self.labels_path = labels_path
+        self.config = config or Config()
+        self.target_accuracy = target_accuracy
+        self.engines = engines or TUNE_ENGINES
+        self.samples = []  # [(ROI 크롭 목록, 정답 목록), ...]
+        self.results = []
+
+    def load_samples(self):
+        """라벨 CSV(timestamp, number_1, number_2)의 각 시점 프레임에서 ROI 크롭 준비"""
+        labels = pd.read_csv(self.labels_path, dtype={'number_1': str, 'number_2': str})
+        if 'timestamp' not in labels.columns:
+            raise ValueError(f"라벨 파일에 timestamp 열이 없습니다: {self.labels_path}")
+
+        # 사이드카가 있으면 재사용하고, 없으면 스캔하여 다음 실행을 위해 저장
+        index = FrameIndex.load_or_scan(self.video_path)
+        regions = [self.config.ROI_REGION_1, self.config.ROI_REGION_2]
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {self.video_path}")
+
+        try:
+            # 탐색 횟수를 줄이기 위해 프레임 순서대로 읽음
+            rows = sorted(labels.itertuples(index=False), key=lambda row: row.timestamp)
+            for row in rows:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index.frame_at(float(row.timestamp)))
+                ret, frame = cap.read()
+                if not ret:
+                    print(f"경고: {row.timestamp}초 프레임을 읽을 수 없어 건너뜁니다.")
+                    continue
+
+                crops = VideoProcessor.crop_regions(frame, regions)
+                expected = [getattr(row, 'number_1', None), getattr(row, 'number_2', None)]
+                self.samples.append((crops, expected))
+        finally:
+            cap.release()
+
+        print(f"라벨 샘플 {len(self.samples)}개 준비됨")
+
+    def candidates(self) -> List[Dict]:
+        """평가할 설정 조합 목록"""
+        candidates = []
+        for engine in self.engines:
+            skip_options = TUNE_SKIP_DETECTION if engine == "easyocr" else [False]
+            for scale, blur, threshold, skip in itertools.product(
+                    TUNE_SCALES, TUNE_BLURS, TUNE_THRESHOLDS, skip_options):
+                candidates.append({
+                    'OCR_ENGINE': engine,
+                    'PREPROCESS_SCALE': scale,
+                    'PREPROCESS_BLUR': blur,
+                    'PREPROCESS_THRESHOLD': threshold,
+                    'PREPROCESS_CLOSE': self.config.PREPROCESS_CLOSE,
+                    'OCR_SKIP_DETECTION': skip,
+                })
+        return candidates
+
+    def candidate_config(self, candidate: Dict) -> Config:
+        """후보 조합을 적용한 설정 - 프로파일을 불러올 때(Config.load_profile)와 같은 방식"""
+        config = copy.copy(self.config)
+        for key, value in candidate.items():
+            setattr(config, key, value)
+        return config
+
+    @staticmethod
+    def _matches(value: Optional[str], expected: str) -> bool:
+        """인식 값과 정답 비교 (숫자로 해석되면 값으로 비교)"""
+        if value is None:
+            return False
+        try:
+            return float(value) == float(expected)
+        except ValueError:
+            return value.strip() == expected.strip()
+
+    def evaluate(self, reader: OCRReader) -> Dict:
+        """현재 reader 설정의 정확도와 ROI/초 측정"""
+        correct = 0
+        total = 0
+        rois = 0
+
+        start = time.perf_counter()
+        for crops, expected in self.samples:
+            for crop, label in zip(crops, expected):
+                value = reader.extract_numbers(crop)
+                rois += 1
+                # 정답이 비어 있는 ROI는 정확도 계산에서 제외
+                if label is None or pd.isna(label):
+                    continue
+                total += 1
+                correct += self._matches(value, label)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'accuracy': correct / total if total else 0.0,
+            'roi_per_sec': rois / elapsed if elapsed > 0 else float('inf'),
+        }
+
+    def run(self) -> Optional[Tuple[Dict, Dict]]:
+        """모든 조합을 평가하고 목표 정확도 이상에서 가장 빠른 (설정, 측정값) 반환"""
+        if not self.samples:
+            self.load_samples()
+        if not self.samples:
+            raise ValueError("평가할 라벨 샘플이 없습니다.")
+
+        # 엔진 초기화(특히 EasyOCR 모델 로딩)는 한 번만 수행하고 전처리 파라미터만 바꿔 가며 평가
+        readers = {}
+        candidates = self.candidates()
+        for i, candidate in enumerate(candidates, 1):
+            # 기본 설정에 후보 값을 덮어쓴 설정 (TESSERACT_CONFIG 등 후보에 없는 값은 그대로)
+            config = self.candidate_config(candidate)
+            engine = config.OCR_ENGINE
+            if engine not in readers:
+                try:
+                    readers[engine] = OCRReader(engine, config)
+                except Exception as e:
+                    print(f"{engine} 엔진을 사용할 수 없어 건너뜁니다: {e}")
+                    readers[engine] = None
+            reader = readers[engine]
+            if reader is None:
+                continue
+
+            reader.configure(config)
+
+            metrics = self.evaluate(reader)
+            self.results.append((candidate, metrics))
+            print(f"[{i}/{len(candidates)}] {candidate} -> 정확도 {metrics['accuracy']:.3f}, "
+                  f"{metrics['roi_per_sec']:.1f} ROI/초")
+
+        if not self.results:
+            return None
+
+        passing = [r for r in self.results if r[1]['accuracy'] >= self.target_accuracy]
+        if passing:
+            return max(passing, key=lambda r: r[1]['roi_per_sec'])
+
+        print(f"경고: 목표 정확도 {self.target_accuracy:.3f}를 만족하는 설정이 없어 가장 정확한 설정을 선택합니다.")
+        return max(self.results, key=lambda r: (r[1]['accuracy'], r[1]['roi_per_sec']))
+
+    def write_profile(self, best, output_path: str) -> str:
+        """선택된 설정을 Config.load_profile로 읽을 수 있는 프로파일(JSON)로 저장"""
+        candidate, metrics = best
+        profile = {
+            'config': dict(candidate),
+            'metrics': {
+                'accuracy': metrics['accuracy'],
+                'roi_per_sec': metrics['roi_per_sec'],
+                'target_accuracy': self.target_accuracy,
+                'samples': len(self.samples),
+            },
+            'video': self.video_path,
+            'labels': self.labels_path,
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        print(f"튜닝 프로파일이 저장되었습니다: {output_path}")
+        return output_path
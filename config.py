@@ -1,4 +1,6 @@
 # 동영상 처리 설정
+import json
+
 class Config:
     def __init__(self):
         # ROI (Region of Interest) 설정 - 숫자가 나타나는 영역
@@ -10,12 +12,45 @@ class Config:
         self.OCR_ENGINE = "easyocr"  # "easyocr" 또는 "tesseract"
         self.TESSERACT_CONFIG = '--oem 3 --psm 8 -c tessedit_char_whitelist=0123456789.-'
         
+        # OCR 전처리 설정 (--tune으로 만든 프로파일로 덮어쓸 수 있음)
+        self.PREPROCESS_SCALE = 3  # 확대 배율
+        self.PREPROCESS_BLUR = 3  # 미디언 블러 커널 크기 (0: 사용 안 함)
+        self.PREPROCESS_THRESHOLD = "otsu"  # "otsu", "adaptive" 또는 "none"
+        self.PREPROCESS_CLOSE = 2  # 닫힘 연산 커널 크기 (0: 사용 안 함)
+        self.OCR_SKIP_DETECTION = False  # EasyOCR 글자 영역 검출을 건너뛰고 ROI 전체를 한 줄로 인식
+        
         # 프레임 처리 설정
         self.FRAME_SKIP = 30  # 30프레임마다 처리 (1초마다, 30fps 기준)
         
+        # ROI 편집기 탐색 설정
+        self.FRAME_CACHE_MB = 512  # 디코딩된 프레임 캐시 메모리 한도 (MB)
+        self.PREFETCH_FRAMES = 30  # 현재 위치 앞뒤로 미리 디코딩할 프레임 수
+        self.LIVE_OCR_PREVIEW = True  # 편집 중 ROI별 OCR 결과 미리보기
+        
+        # 결과 캐시 설정 (동영상/프레임/ROI/엔진/전처리가 같으면 이전 OCR 결과 재사용)
+        self.USE_RESULT_CACHE = True
+        self.RESULT_CACHE_PATH = "~/.cache/v2csv/results.sqlite"
+        self.RESULT_CACHE_MAX_ENTRIES = 1000000  # 초과 시 가장 오래 사용되지 않은 결과부터 삭제
+        
+        # 프레임 메모리 설정
+        self.LOW_MEMORY_FRAMES = True  # ROI 영역만 잘라 사용 (지원하는 백엔드에서는 BGR 대신 그레이스케일로 디코딩)
+        
+        # 분산 처리 설정 (--worker)
+        self.WORKER_HEARTBEAT_SEC = 10  # 처리 중 작업의 임대 갱신 간격 (초)
+        self.WORKER_LEASE_SEC = 120  # 이 시간 동안 하트비트가 없으면 작업을 다시 대기열로
+        self.WORKER_MAX_ATTEMPTS = 3  # 이 횟수만큼 실패하면 failed로 이동
+        self.WORKER_POLL_SEC = 5  # 가져올 작업이 없을 때 대기 간격 (초)
+        
         # 출력 설정
         self.OUTPUT_CSV = "extracted_numbers.csv"
         
         # 디버그 설정
         self.SAVE_DEBUG_IMAGES = True
-        self.DEBUG_DIR = "debug_frames"
\ No newline at end of file
+        self.DEBUG_DIR = "debug_frames"
+    
+    def load_profile(self, path):
+        """자동 튜너가 만든 프로파일(JSON)의 설정값 적용"""
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+        for key, value in profile['config'].items():
+            setattr(self, key, value)
@@ -0,0 +1,166 @@
+import cv2
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional
+from frame_index import FrameIndex
+
+
+class FrameCache:
+    """디코딩된 프레임 LRU 캐시 (메모리 사용량 한도 기반)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, frame_idx: int) -> bool:
+        with self._lock:
+            return frame_idx in self._frames
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, frame_idx: int) -> Optional[np.ndarray]:
+        """캐시에서 프레임 조회 (최근 사용으로 갱신)"""
+        with self._lock:
+            frame = self._frames.get(frame_idx)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(frame_idx)
+            self.hits += 1
+            return frame
+
+    def put(self, frame_idx: int, frame: np.ndarray):
+        """프레임 저장 - 한도를 넘으면 가장 오래 사용되지 않은 프레임부터 제거"""
+        if frame.nbytes > self.max_bytes:
+            return
+
+        # 캐시된 프레임은 여러 곳에서 공유되므로 읽기 전용으로 설정
+        frame.flags.writeable = False
+
+        with self._lock:
+            if frame_idx in self._frames:
+                self._frames.move_to_end(frame_idx)
+                return
+
+            self._frames[frame_idx] = frame
+            self._nbytes += frame.nbytes
+
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._nbytes = 0
+
+
+class _FrameDecoder:
+    """VideoCapture 래퍼 - 디코더 위치를 추적하여 불필요한 탐색을 피함"""
+
+    def __init__(self, video_path: str, index: FrameIndex):
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {video_path}")
+        self.index = index
+        self.position = 0  # 다음 read()가 반환할 프레임 번호
+
+    def decode(self, frame_idx: int, cache: FrameCache) -> Optional[np.ndarray]:
+        """frame_idx 프레임 디코딩 - 지나가는 중간 프레임도 캐시에 저장"""
+        keyframe = self.index.keyframe_for(frame_idx)
+
+        # 같은 키프레임 구간 안에서 앞쪽이면 계속 읽는 편이 탐색보다 빠름
+        if not (keyframe <= self.position <= frame_idx):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.position = keyframe
+
+        frame = None
+        while self.position <= frame_idx:
+            ret, frame = self.cap.read()
+            if not ret:
+                # 헤더의 프레임 수가 실제보다 큰 경우 다음 호출에서 다시 탐색하도록 함
+                self.position = -1
+                return None
+            cache.put(self.position, frame)
+            self.position += 1
+
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+
+class CachedFrameReader:
+    """키프레임 인덱스, LRU 캐시, 백그라운드 프리페치를 사용하는 임의 접근 프레임 리더"""
+
+    def __init__(self, video_path: str, index: FrameIndex,
+                 cache_bytes: int, prefetch_frames: int):
+        self.index = index
+        self.cache = FrameCache(cache_bytes)
+
+        # 프리페치가 캐시를 밀어내지 않도록 반경을 캐시 용량의 1/3 이하로 제한
+        frame_bytes = index.width * index.height * 3
+        if frame_bytes > 0:
+            prefetch_frames = min(prefetch_frames, cache_bytes // frame_bytes // 3)
+        self.prefetch_frames = max(prefetch_frames, 0)
+
+        # VideoCapture는 스레드 안전하지 않으므로 프리페치용 디코더를 따로 사용
+        self._decoder = _FrameDecoder(video_path, index)
+        self._prefetch_decoder = _FrameDecoder(video_path, index)
+
+        self._target = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+        self._thread.start()
+
+    def read(self, frame_idx: int) -> Optional[np.ndarray]:
+        """프레임 읽기 (캐시 우선) 후 주변 프레임 프리페치 요청"""
+        frame = self.cache.get(frame_idx)
+        if frame is None:
+            frame = self._decoder.decode(frame_idx, self.cache)
+
+        self._target = frame_idx
+        self._wakeup.set()
+        return frame
+
+    def _prefetch_order(self, center: int) -> List[int]:
+        """프리페치 순서 - 재생 방향(앞쪽)을 먼저, 뒤쪽은 순차 디코딩이 되도록 오름차순"""
+        last = self.index.frame_count - 1
+        ahead = range(center + 1, min(center + self.prefetch_frames, last) + 1)
+        behind = range(max(center - self.prefetch_frames, 0), center)
+        return list(ahead) + list(behind)
+
+    def _prefetch_loop(self):
+        """프리페치 스레드 - 새 요청이 들어오면 진행 중인 작업을 버리고 새 위치 기준으로 시작"""
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            for frame_idx in self._prefetch_order(self._target):
+                if self._stop.is_set() or self._wakeup.is_set():
+                    break
+                if frame_idx in self.cache:
+                    continue
+                if self._prefetch_decoder.decode(frame_idx, self.cache) is None:
+                    break
+
+    def close(self):
+        """프리페치 스레드 종료 및 리소스 해제"""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._decoder.release()
+        self._prefetch_decoder.release()
+        self.cache.clear()
@@ -0,0 +1,175 @@
+import cv2
+import os
+import numpy as np
+from typing import Optional, Tuple
+
+INDEX_VERSION = 1
+SIDECAR_SUFFIX = ".v2idx.npz"
+
+
+def video_fingerprint(video_path: str) -> Tuple[int, int]:
+    """동영상 파일 식별값 (파일 크기, 수정 시각 ns)"""
+    stat = os.stat(video_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def sidecar_path(video_path: str) -> str:
+    """프레임 인덱스 사이드카 파일 경로"""
+    return video_path + SIDECAR_SUFFIX
+
+
+class FrameIndex:
+    """동영상 프레임 인덱스 - 프레임별 타임스탬프와 탐색 기준 키프레임 위치"""
+
+    def __init__(self, fps: float, width: int, height: int,
+                 pts: np.ndarray, keyframes: np.ndarray):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.pts = pts              # 프레임별 타임스탬프 (초)
+        self.keyframes = keyframes  # 탐색 기준 키프레임 번호 (오름차순)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    @classmethod
+    def from_capture(cls, cap: cv2.VideoCapture,
+                     keyframe_interval: Optional[int] = None) -> 'FrameIndex':
+        """동영상 헤더 정보로 인덱스 생성 (디코딩 없이 즉시 생성)"""
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # OpenCV는 실제 키프레임 위치를 제공하지 않으므로 일정 간격(기본 1초)을 기준점으로 사용
+        if keyframe_interval is None:
+            keyframe_interval = int(round(fps))
+        keyframe_interval = max(keyframe_interval, 1)
+
+        pts = np.arange(frame_count, dtype=np.float64) / fps
+        keyframes = np.arange(0, max(frame_count, 1), keyframe_interval, dtype=np.int64)
+        return cls(fps, width, height, pts, keyframes)
+
+    @classmethod
+    def from_pts(cls, fps: float, width: int, height: int, pts: np.ndarray,
+                 keyframe_seconds: float = 1.0) -> 'FrameIndex':
+        """실제 프레임 타임스탬프로 인덱스 생성 - 키프레임은 일정 시간 간격마다 지정"""
+        pts = np.asarray(pts, dtype=np.float64)
+        if len(pts) == 0:
+            return cls(fps, width, height, pts, np.zeros(1, dtype=np.int64))
+
+        # 가변 프레임레이트에서도 기준점이 시간상 고르게 놓이도록 구간 경계를 넘는 첫 프레임을 사용
+        buckets = np.floor((pts - pts[0]) / keyframe_seconds).astype(np.int64)
+        keyframes = np.flatnonzero(np.diff(buckets, prepend=-1)).astype(np.int64)
+        return cls(fps, width, height, pts, keyframes)
+
+    @classmethod
+    def scan(cls, video_path: str) -> 'FrameIndex':
+        """동영상 전체를 한 번 읽어 프레임별 실제 타임스탬프(PTS)로 인덱스 생성"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {video_path}")
+
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+            # 색변환(retrieve) 없이 grab만 하여 타임스탬프 수집
+            pts = []
+            while cap.grab():
+                pts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        finally:
+            cap.release()
+
+        return cls.from_pts(fps, width, height, cls.sanitize_pts(pts, fps))
+
+    @staticmethod
+    def sanitize_pts(pts, fps: float) -> np.ndarray:
+        """백엔드가 타임스탬프를 제공하지 않는 경우 frame / fps 로 대체"""
+        pts = np.asarray(pts, dtype=np.float64)
+        if len(pts) > 1 and (pts[-1] <= 0 or np.any(np.diff(pts) < 0)):
+            return np.arange(len(pts), dtype=np.float64) / fps
+        return pts
+
+    @classmethod
+    def load(cls, video_path: str) -> Optional['FrameIndex']:
+        """사이드카 파일에서 인덱스 로드 - 없거나 동영상이 바뀌었으면 None"""
+        path = sidecar_path(video_path)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != INDEX_VERSION:
+                    return None
+                if tuple(int(v) for v in data['fingerprint']) != video_fingerprint(video_path):
+                    return None
+                fps, width, height = data['meta']
+                return cls(float(fps), int(width), int(height),
+                           data['pts'].copy(), data['keyframes'].copy())
+        except Exception as e:
+            print(f"프레임 인덱스 로드 중 오류 (무시하고 계속): {e}")
+            return None
+
+    def save(self, video_path: str) -> str:
+        """인덱스를 동영상 옆 사이드카 파일(.npz)에 저장"""
+        path = sidecar_path(video_path)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path,
+                 version=np.int64(INDEX_VERSION),
+                 fingerprint=np.array(video_fingerprint(video_path), dtype=np.int64),
+                 meta=np.array([self.fps, self.width, self.height], dtype=np.float64),
+                 pts=self.pts,
+                 keyframes=self.keyframes)
+        # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 원자적으로 교체
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load_or_scan(cls, video_path: str) -> 'FrameIndex':
+        """사이드카가 있으면 로드하고, 없으면 전체 스캔 후 저장"""
+        index = cls.load(video_path)
+        if index is None:
+            index = cls.scan(video_path)
+            try:
+                index.save(video_path)
+            except OSError as e:
+                # 읽기 전용 공유 디렉토리 등 - 저장하지 못해도 메모리의 인덱스로 계속 진행
+                print(f"프레임 인덱스를 저장할 수 없습니다: {e}")
+        return index
+
+    @classmethod
+    def from_video(cls, video_path: str) -> 'FrameIndex':
+        """동영상 파일의 프레임 인덱스 - 사이드카가 있으면 사용하고, 없으면 헤더 정보로 즉시 생성"""
+        index = cls.load(video_path)
+        if index is not None:
+            return index
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {video_path}")
+        try:
+            return cls.from_capture(cap)
+        finally:
+            cap.release()
+
+    def keyframe_for(self, frame_idx: int) -> int:
+        """frame_idx 이전(포함)의 가장 가까운 키프레임 번호"""
+        pos = int(np.searchsorted(self.keyframes, frame_idx, side='right')) - 1
+        return int(self.keyframes[max(pos, 0)])
+
+    def timestamp(self, frame_idx: int) -> float:
+        """프레임 번호의 타임스탬프 (초)"""
+        if 0 <= frame_idx < self.frame_count:
+            return float(self.pts[frame_idx])
+        return frame_idx / self.fps
+
+    def frame_at(self, seconds: float) -> int:
+        """타임스탬프(초)에 가장 가까운 프레임 번호"""
+        if self.frame_count == 0:
+            return 0
+        # 반 프레임만큼 여유를 두어 부동소수점 오차로 한 프레임 앞이 선택되지 않도록 함
+        idx = int(np.searchsorted(self.pts, seconds + 0.5 / self.fps, side='right')) - 1
+        return min(max(idx, 0), self.frame_count - 1)
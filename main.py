@@ -7,31 +7,135 @@ import sys
 from pathlib import Path
 from video_processor import VideoProcessor
 from config import Config
+from frame_index import FrameIndex
+from roi_store import ROIStripStore
+from auto_tuner import AutoTuner
+from work_queue import WorkQueue
 
 def main():
     parser = argparse.ArgumentParser(description='MP4 동영상에서 숫자를 추출하여 CSV로 저장')
-    parser.add_argument('video_path', help='처리할 MP4 동영상 파일 경로')
+    parser.add_argument('video_path', nargs='?', help='처리할 MP4 동영상 파일 경로')
     parser.add_argument('-o', '--output', help='출력 CSV 파일 경로 (기본값: extracted_numbers.csv)')
     parser.add_argument('--setup-roi', action='store_true', help='ROI 영역 설정 도움말 표시')
     parser.add_argument('--edit-roi', action='store_true', help='ROI 편집기 시작 (마우스로 ROI 수정 가능)')
     parser.add_argument('--frame-skip', type=int, default=30, help='프레임 건너뛰기 간격 (기본값: 30)')
-    parser.add_argument('--ocr-engine', choices=['easyocr', 'tesseract'], default='easyocr', 
-                       help='사용할 OCR 엔진 선택 (기본값: easyocr)')
+    parser.add_argument('--build-index', action='store_true',
+                       help='프레임 인덱스(실제 타임스탬프, 키프레임, 해상도)를 만들어 사이드카 파일로 저장')
+    parser.add_argument('--build-roi-store', metavar='DIR',
+                       help='동영상을 한 번 디코딩하여 샘플 프레임의 ROI 크롭을 DIR에 메모리 맵 배열로 저장')
+    parser.add_argument('--roi-store', metavar='DIR',
+                       help='동영상 대신 ROI 저장소(DIR)에서 바로 숫자 추출 (디코딩 없음)')
+    parser.add_argument('--shard', metavar='K/N',
+                       help='--roi-store 처리 시 N개 중 K번째(0부터) 몫만 처리 (예: 0/4)')
+    parser.add_argument('--enqueue', metavar='QUEUE_DIR',
+                       help='동영상을 공유 작업 디렉토리에 분산 처리 작업으로 등록')
+    parser.add_argument('--segments', type=int, default=1,
+                       help='--enqueue 시 동영상을 나눌 구간 작업 수 (기본값: 1)')
+    parser.add_argument('--worker', metavar='QUEUE_DIR',
+                       help='작업 디렉토리의 작업을 대기열이 빌 때까지 가져와 처리')
+    parser.add_argument('--collect', metavar='QUEUE_DIR',
+                       help='작업 디렉토리의 완료된 결과를 하나의 CSV(-o)로 합치기')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='이전 실행의 OCR 결과 캐시를 사용하지 않고 모두 다시 인식')
+    parser.add_argument('--ocr-engine', choices=['easyocr', 'tesseract'], 
+                       help='사용할 OCR 엔진 선택 (기본값: config.py 또는 프로파일 설정)')
+    parser.add_argument('--profile', help='자동 튜너가 만든 설정 프로파일(JSON) 적용')
+    parser.add_argument('--tune', metavar='LABELS_CSV',
+                       help='라벨 CSV(timestamp, number_1, number_2)로 가장 빠른 전처리/엔진 설정 탐색')
+    parser.add_argument('--target-accuracy', type=float, default=0.95,
+                       help='--tune 시 만족해야 할 최소 정확도 (기본값: 0.95)')
+    parser.add_argument('--profile-out', default='tuned_profile.json',
+                       help='--tune 결과 프로파일 저장 경로 (기본값: tuned_profile.json)')
     
     args = parser.parse_args()
     
-    # 동영상 파일 존재 확인
-    if not os.path.exists(args.video_path):
+    # 분산 처리 워커 / 결과 합치기 (동영상 경로 불필요)
+    if args.worker:
+        WorkQueue(args.worker).work(Config())
+        return
+    
+    if args.collect:
+        queue = WorkQueue(args.collect)
+        output_file = args.output or Config().OUTPUT_CSV
+        df = queue.collect(output_file)
+        print(f"작업 상태: {queue.status()}")
+        print(f"{len(df)}개 행을 합쳐 저장했습니다: {output_file}")
+        return
+    
+    if not args.video_path:
+        parser.error("video_path가 필요합니다 (--worker, --collect 제외)")
+    
+    # 동영상 파일 존재 확인 (ROI 저장소로 처리할 때는 원본 동영상이 없어도 됨)
+    if not args.roi_store and not os.path.exists(args.video_path):
         print(f"오류: 동영상 파일을 찾을 수 없습니다: {args.video_path}")
         sys.exit(1)
     
+    # 프레임 인덱스 생성
+    if args.build_index:
+        print(f"프레임 인덱스 생성 중: {args.video_path}")
+        index = FrameIndex.scan(args.video_path)
+        path = index.save(args.video_path)
+        print(f"- 총 프레임 수: {index.frame_count}")
+        print(f"- 해상도: {index.width}x{index.height}")
+        print(f"- 키프레임(탐색 기준점) 수: {len(index.keyframes)}")
+        print(f"프레임 인덱스가 저장되었습니다: {path}")
+        return
+    
     # 설정 조정
     config = Config()
+    if args.profile:
+        config.load_profile(args.profile)
     config.FRAME_SKIP = args.frame_skip
-    config.OCR_ENGINE = args.ocr_engine
+    if args.ocr_engine:
+        config.OCR_ENGINE = args.ocr_engine
+    if args.no_cache:
+        config.USE_RESULT_CACHE = False
     if args.output:
         config.OUTPUT_CSV = args.output
     
+    # 샤드 지정 확인
+    shard_index, shard_count = 0, 1
+    if args.shard:
+        # 동영상을 직접 처리할 때는 샤드를 나누지 않으므로 무시하지 않고 오류로 알림
+        if not args.roi_store:
+            parser.error("--shard는 --roi-store와 함께 사용해야 합니다")
+        try:
+            shard_index, shard_count = (int(v) for v in args.shard.split('/'))
+        except ValueError:
+            shard_count = 0
+        if not 0 <= shard_index < shard_count:
+            parser.error(f"--shard 형식이 올바르지 않습니다 (예: 0/4): {args.shard}")
+    
+    # 분산 처리 작업 등록
+    if args.enqueue:
+        queue = WorkQueue(args.enqueue)
+        job_ids = queue.enqueue(args.video_path, config, max(args.segments, 1))
+        print(f"{len(job_ids)}개 작업을 등록했습니다: {args.enqueue}")
+        print(f"작업 상태: {queue.status()}")
+        print(f"각 장비에서 실행: python main.py --worker {args.enqueue}")
+        return
+    
+    # 전처리/엔진 자동 튜닝
+    if args.tune:
+        engines = [args.ocr_engine] if args.ocr_engine else None
+        tuner = AutoTuner(args.video_path, args.tune, config, args.target_accuracy, engines)
+        best = tuner.run()
+        if best is None:
+            print("오류: 평가할 수 있는 OCR 엔진이 없습니다.")
+            sys.exit(1)
+        candidate, metrics = best
+        print(f"\n선택된 설정: {candidate}")
+        print(f"정확도: {metrics['accuracy']:.3f}, 속도: {metrics['roi_per_sec']:.1f} ROI/초")
+        tuner.write_profile(best, args.profile_out)
+        print(f"사용법: python main.py {args.video_path} --profile {args.profile_out}")
+        return
+    
+    # ROI 저장소 생성
+    if args.build_roi_store:
+        regions = [config.ROI_REGION_1, config.ROI_REGION_2]
+        ROIStripStore.build(args.video_path, args.build_roi_store, regions, config.FRAME_SKIP)
+        return
+    
     # VideoProcessor 초기화
     processor = VideoProcessor(args.video_path, config)
     
@@ -55,12 +159,16 @@ def main():
         return
     
     try:
-        print(f"동영상 처리 시작: {args.video_path}")
         print(f"OCR 엔진: {config.OCR_ENGINE}")
-        print(f"프레임 건너뛰기: {config.FRAME_SKIP}")
-        
-        # 동영상 처리
-        df = processor.process_video()
+        if args.roi_store:
+            # ROI 저장소 처리 (프레임 간격은 저장소 생성 시 정해짐)
+            df = processor.process_roi_store(args.roi_store, shard_index, shard_count)
+        else:
+            print(f"동영상 처리 시작: {args.video_path}")
+            print(f"프레임 건너뛰기: {config.FRAME_SKIP}")
+            
+            # 동영상 처리
+            df = processor.process_video()
         
         # 결과 요약 출력
         print("\n=== 처리 결과 요약 ===")
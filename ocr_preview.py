@@ -0,0 +1,92 @@
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+from config import Config
+from ocr_reader import OCRReader
+
+
+class OCRPreviewWorker:
+    """ROI 편집기용 백그라운드 OCR 워커 - 항상 가장 최근 요청만 처리"""
+
+    def __init__(self, engine: str, config: Optional[Config] = None):
+        self.engine = engine
+        self.config = config
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._request = None
+        self._generation = 0  # 마지막으로 제출된 요청 번호
+        self._results = None  # (요청 번호, [(이진화 이미지, 인식 값), ...])
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, regions: List[Tuple[int, int, int, int]]):
+        """새 프레임/ROI 상태 제출 - 처리 대기 중이거나 진행 중인 이전 요청은 취소됨"""
+        with self._lock:
+            self._generation += 1
+            self._request = (self._generation, frame, [tuple(r) for r in regions])
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> bool:
+        """최신 요청의 결과가 아직 준비되지 않았는지 여부"""
+        results = self._results
+        return results is None or results[0] != self._generation
+
+    def latest(self) -> Optional[List[Tuple[Optional[np.ndarray], Optional[str]]]]:
+        """가장 최근에 완료된 ROI별 (이진화 이미지, 인식 값) 목록"""
+        results = self._results
+        return results[1] if results else None
+
+    def _is_stale(self, generation: int) -> bool:
+        return generation != self._generation or self._stop.is_set()
+
+    def _run(self):
+        """워커 스레드 - OCR 엔진 로딩이 느리므로 스레드 안에서 생성"""
+        try:
+            reader = OCRReader(self.engine, self.config)
+        except Exception as e:
+            self.error = str(e)
+            print(f"OCR 미리보기 초기화 중 오류: {e}")
+            return
+
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            with self._lock:
+                request, self._request = self._request, None
+            if request is None:
+                continue
+
+            generation, frame, regions = request
+            results = []
+            for x, y, w, h in regions:
+                # ROI 사이마다 더 새로운 요청이 들어왔는지 확인하여 오래된 작업은 중단
+                if self._is_stale(generation):
+                    break
+
+                roi = frame[y:y+h, x:x+w]
+                if roi.size == 0:
+                    results.append((None, None))
+                    continue
+
+                try:
+                    binary = reader.preprocess_image(roi)
+                    value = None if self._is_stale(generation) else reader.recognize(binary)
+                except Exception as e:
+                    print(f"OCR 미리보기 처리 중 오류: {e}")
+                    binary, value = None, None
+                results.append((binary, value))
+            else:
+                if not self._is_stale(generation):
+                    self._results = (generation, results)
+
+    def close(self):
+        """워커 스레드 종료"""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=1.0)
@@ -6,8 +6,12 @@ import re
 from typing import Optional, Tuple
 from config import Config
 
+# EasyOCR 인식 문자 집합 - 검출 여부와 관계없이 같은 문자 집합을 사용해야 튜닝 비교가 공정함
+DIGIT_ALLOWLIST = '0123456789.-'
+
 class OCRReader:
-    def __init__(self, engine: str = "easyocr"):
+    def __init__(self, engine: str = "easyocr", config: Optional[Config] = None):
+        config = config or Config()
         self.engine = engine.lower()
         if self.engine == "easyocr":
             self.reader = easyocr.Reader(['en'], gpu=False)
@@ -17,6 +21,32 @@ class OCRReader:
             pass
         else:
             raise ValueError("지원되는 OCR 엔진: 'easyocr', 'tesseract'")
+        
+        self.configure(config)
+    
+    def configure(self, config: Config):
+        """설정의 전처리/인식 파라미터 적용 (엔진을 다시 로딩하지 않음)"""
+        self.tesseract_config = config.TESSERACT_CONFIG
+        self.skip_detection = config.OCR_SKIP_DETECTION
+        
+        # 전처리 파라미터
+        self.scale_factor = config.PREPROCESS_SCALE
+        self.median_ksize = config.PREPROCESS_BLUR
+        self.threshold = config.PREPROCESS_THRESHOLD
+        self.close_kernel = config.PREPROCESS_CLOSE
+    
+    @property
+    def signature(self) -> str:
+        """전처리/인식 파라미터 식별 문자열 (결과 캐시 키로 사용)"""
+        signature = (f"scale={self.scale_factor},median={self.median_ksize},"
+                     f"threshold={self.threshold},close={self.close_kernel},"
+                     f"skip_detection={self.skip_detection}")
+        if self.engine == "tesseract":
+            # --psm, 화이트리스트 등에 따라 인식 결과가 달라지므로 키에 포함
+            signature += f",tesseract_config={self.tesseract_config}"
+        else:
+            signature += f",allowlist={DIGIT_ALLOWLIST}"
+        return signature
     
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """이미지 전처리 - OCR 정확도 향상을 위함"""
@@ -27,30 +57,56 @@ class OCRReader:
             gray = image
         
         # 이미지 크기 확대 (OCR 정확도 향상)
-        scale_factor = 3
+        scale_factor = self.scale_factor
         height, width = gray.shape
-        resized = cv2.resize(gray, (width * scale_factor, height * scale_factor), 
-                           interpolation=cv2.INTER_CUBIC)
+        if scale_factor != 1:
+            resized = cv2.resize(gray, (width * scale_factor, height * scale_factor), 
+                               interpolation=cv2.INTER_CUBIC)
+        else:
+            resized = gray
         
         # 노이즈 제거
-        denoised = cv2.medianBlur(resized, 3)
+        if self.median_ksize > 1:
+            denoised = cv2.medianBlur(resized, self.median_ksize)
+        else:
+            denoised = resized
         
         # 이진화
-        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if self.threshold == "otsu":
+            _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        elif self.threshold == "adaptive":
+            binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                           cv2.THRESH_BINARY, 31, 10)
+        else:
+            binary = denoised
         
         # 모폴로지 연산으로 글자 연결
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-        processed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        if self.close_kernel > 1:
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (self.close_kernel, self.close_kernel))
+            processed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        else:
+            processed = binary
         
         return processed
     
-    def extract_numbers(self, image: np.ndarray) -> Optional[str]:
+    def extract_numbers(self, image: np.ndarray, strict: bool = False) -> Optional[str]:
         """이미지에서 숫자 추출"""
         processed_image = self.preprocess_image(image)
+        return self.recognize(processed_image, strict)
+    
+    def recognize(self, processed_image: np.ndarray, strict: bool = False) -> Optional[str]:
+        """전처리된 이미지에서 숫자 인식
         
+        숫자를 찾지 못하면 None 반환. OCR 엔진 오류도 기본적으로 None으로 처리하지만,
+        strict=True이면 예외를 그대로 발생시켜 "숫자 없음"과 구분할 수 있게 함
+        """
         try:
             if self.engine == "easyocr":
-                results = self.reader.readtext(processed_image)
+                if self.skip_detection:
+                    # 검출 단계 없이 이미지 전체를 한 줄로 인식
+                    results = self.reader.recognize(processed_image, allowlist=DIGIT_ALLOWLIST)
+                else:
+                    results = self.reader.readtext(processed_image, allowlist=DIGIT_ALLOWLIST)
                 if results:
                     # 가장 신뢰도가 높은 결과 선택
                     best_result = max(results, key=lambda x: x[2])
@@ -58,7 +114,7 @@ class OCRReader:
                 else:
                     text = ""
             else:  # tesseract
-                text = pytesseract.image_to_string(processed_image, config=Config.TESSERACT_CONFIG)
+                text = pytesseract.image_to_string(processed_image, config=self.tesseract_config)
             
             # 숫자만 추출
             numbers = re.findall(r'-?\d+\.?\d*', text.strip())
@@ -67,6 +123,8 @@ class OCRReader:
             return None
             
         except Exception as e:
+            if strict:
+                raise
             print(f"OCR 처리 중 오류: {e}")
             return None
     
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+# 캐시에 없음을 나타내는 값 (None은 "숫자를 찾지 못함"이라는 유효한 결과)
+MISS = object()
+
+# 이 개수만큼 결과가 모이면 짧은 트랜잭션 하나로 기록 (쓰기 잠금을 오래 잡지 않도록)
+WRITE_BATCH = 64
+
+
+class ResultCache:
+    """실행 간 OCR 결과 저장소 - (동영상, 프레임, ROI, 엔진, 전처리) 단위로 결과 재사용"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._touched = []  # 마지막 flush 이후 조회된 항목 id (접근 시각은 한꺼번에 갱신)
+        self._pending = []  # 아직 기록하지 않은 결과
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 여러 프로세스가 같은 파일을 쓸 수 있으므로 잠금 대기 시간을 넉넉히 둠
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                video TEXT NOT NULL,
+                frame INTEGER NOT NULL,
+                roi TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                params TEXT NOT NULL,
+                value TEXT,
+                accessed REAL NOT NULL,
+                UNIQUE (video, frame, roi, engine, params)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def video_key(fingerprint: Tuple[int, int]) -> str:
+        """동영상 식별 키 (파일 크기, 수정 시각)"""
+        return f"{fingerprint[0]}:{fingerprint[1]}"
+
+    @staticmethod
+    def roi_key(region: Tuple[int, int, int, int]) -> str:
+        x, y, w, h = region
+        return f"{x},{y},{w},{h}"
+
+    def get(self, video: str, frame: int, region: Tuple[int, int, int, int],
+            engine: str, params: str):
+        """저장된 결과 조회 - 없으면 MISS 반환"""
+        row = self._conn.execute(
+            "SELECT id, value FROM results WHERE video=? AND frame=? AND roi=? AND engine=? AND params=?",
+            (video, frame, self.roi_key(region), engine, params)).fetchone()
+        if row is None:
+            self.misses += 1
+            return MISS
+
+        self.hits += 1
+        self._touched.append(row[0])
+        return row[1]
+
+    def put(self, video: str, frame: int, region: Tuple[int, int, int, int],
+            engine: str, params: str, value: Optional[str]):
+        """결과 저장 - 메모리에 모았다가 WRITE_BATCH개마다 한 번에 기록"""
+        self._pending.append((video, frame, self.roi_key(region), engine, params, value, time.time()))
+        if len(self._pending) >= WRITE_BATCH:
+            self._write_pending()
+
+    def _write_pending(self):
+        """모인 결과를 하나의 짧은 트랜잭션으로 기록
+
+        OCR 처리 중에는 트랜잭션을 열어 두지 않으므로 같은 캐시 파일을 쓰는
+        다른 프로세스(--shard, 워커)가 잠금 대기로 멈추지 않음
+        """
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (video, frame, roi, engine, params, value, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def flush(self):
+        """남은 결과 기록, 접근 시각 갱신, 한도를 넘은 오래된 항목 제거 (각각 별도 트랜잭션)"""
+        self._write_pending()
+
+        if self._touched:
+            now = time.time()
+            with self._conn:
+                self._conn.executemany("UPDATE results SET accessed=? WHERE id=?",
+                                       [(now, row_id) for row_id in self._touched])
+            self._touched = []
+
+        with self._conn:
+            count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,))
+
+    def close(self):
+        self.flush()
+        self._conn.close()
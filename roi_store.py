@@ -0,0 +1,172 @@
+import cv2
+import json
+import math
+import os
+import numpy as np
+from typing import List, Tuple
+from tqdm import tqdm
+from frame_index import FrameIndex, video_fingerprint
+
+STORE_VERSION = 2
+CROPS_FILE = "crops.npy"            # (프레임, ROI, H, W) uint8 그레이스케일
+TIMESTAMPS_FILE = "timestamps.npy"  # (프레임,) float64 초
+FRAMES_FILE = "frames.npy"          # (프레임,) int64 원본 동영상 프레임 번호
+META_FILE = "meta.json"
+
+
+class ROIStripStore:
+    """동영상을 한 번만 디코딩하여 만든 ROI 크롭 저장소 (메모리 맵 배열)
+
+    여러 프로세스가 같은 파일을 읽기 전용으로 열어 OCR 실험을 나누어 처리할 수 있음
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        meta_path = os.path.join(store_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            raise ValueError(f"ROI 저장소를 찾을 수 없습니다 (생성이 끝나지 않았거나 경로 오류): {store_dir}")
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != STORE_VERSION:
+            raise ValueError(f"지원하지 않는 ROI 저장소 버전입니다: {self.meta.get('version')} "
+                             f"(--build-roi-store로 다시 만드세요)")
+
+        count = self.meta['frame_count']
+        self.video_path = self.meta['video_path']
+        self.fingerprint = tuple(self.meta['fingerprint'])
+        self.regions = [tuple(region) for region in self.meta['regions']]
+        self.frame_skip = self.meta['frame_skip']
+        # 프레임 경계로 잘린 ROI별 실제 크롭 크기 (w, h)
+        self.crop_sizes = [tuple(size) for size in self.meta['crop_sizes']]
+
+        # 읽기 전용 메모리 맵 - 슬라이스는 복사 없이 파일 페이지를 직접 참조
+        self.crops = np.load(os.path.join(store_dir, CROPS_FILE), mmap_mode='r')[:count]
+        self.timestamps = np.load(os.path.join(store_dir, TIMESTAMPS_FILE), mmap_mode='r')[:count]
+        self.frames = np.load(os.path.join(store_dir, FRAMES_FILE), mmap_mode='r')[:count]
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frames)
+
+    def crop(self, position: int, roi_idx: int) -> np.ndarray:
+        """position번째 샘플 프레임의 ROI 크롭 (복사 없는 뷰)
+
+        ROI가 프레임 밖으로 나간 경우 동영상을 직접 처리할 때와 같이 잘린 크기로 반환
+        """
+        w, h = self.crop_sizes[roi_idx]
+        return self.crops[position, roi_idx, :h, :w]
+    
+    @staticmethod
+    def clipped_size(region: Tuple[int, int, int, int], width: int, height: int) -> Tuple[int, int]:
+        """프레임 경계로 잘린 ROI 크기 (w, h)"""
+        x, y, w, h = region
+        return (max(min(x + w, width) - max(x, 0), 0),
+                max(min(y + h, height) - max(y, 0), 0))
+
+    @classmethod
+    def build(cls, video_path: str, store_dir: str,
+              regions: List[Tuple[int, int, int, int]], frame_skip: int) -> 'ROIStripStore':
+        """동영상을 한 번 디코딩하여 샘플 프레임의 ROI 크롭을 저장소로 기록"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {video_path}")
+
+        os.makedirs(store_dir, exist_ok=True)
+        meta_path = os.path.join(store_dir, META_FILE)
+        if os.path.exists(meta_path):
+            # 쓰는 도중에는 저장소가 완성된 것으로 보이지 않도록 메타데이터부터 제거
+            os.remove(meta_path)
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        index = FrameIndex.load(video_path)
+        if index is not None:
+            total_frames = index.frame_count
+            capacity = math.ceil(total_frames / frame_skip)
+        else:
+            # 헤더의 프레임 수는 부정확할 수 있으므로 여유를 둠
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            capacity = math.ceil(total_frames * 1.1 / frame_skip) + 1
+
+        max_h = max(h for _, _, _, h in regions)
+        max_w = max(w for _, _, w, _ in regions)
+        crops = np.lib.format.open_memmap(os.path.join(store_dir, CROPS_FILE), mode='w+',
+                                          dtype=np.uint8, shape=(capacity, len(regions), max_h, max_w))
+        timestamps = np.zeros(capacity, dtype=np.float64)
+        frames = np.zeros(capacity, dtype=np.int64)
+
+        frame_count = 0
+        count = 0
+        pts = []
+        reached_end = False
+        pbar = tqdm(total=total_frames, desc="ROI 저장소 생성 중")
+
+        try:
+            while True:
+                if not cap.grab():
+                    reached_end = True
+                    break
+
+                if index is None:
+                    pts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+
+                if frame_count % frame_skip == 0:
+                    if count >= capacity:
+                        print("경고: 동영상 헤더의 프레임 수보다 프레임이 많아 나머지는 저장하지 못했습니다. "
+                              "--build-index 후 다시 생성하세요.")
+                        break
+
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+
+                    # 헤더의 해상도 대신 실제 디코딩된 프레임 크기 사용
+                    height, width = frame.shape[:2]
+                    for r, (x, y, w, h) in enumerate(regions):
+                        roi = frame[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)]
+                        if roi.size:
+                            crops[count, r, :roi.shape[0], :roi.shape[1]] = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+                    frames[count] = frame_count
+                    timestamps[count] = index.timestamp(frame_count) if index is not None else pts[-1]
+                    count += 1
+
+                frame_count += 1
+                pbar.update(1)
+
+        finally:
+            cap.release()
+            pbar.close()
+
+        if index is None and reached_end:
+            index = FrameIndex.from_pts(fps, width, height, FrameIndex.sanitize_pts(pts, fps))
+            timestamps[:count] = index.pts[frames[:count]]
+            try:
+                index.save(video_path)
+            except OSError as e:
+                print(f"프레임 인덱스를 저장할 수 없습니다: {e}")
+
+        crops.flush()
+        del crops
+        np.save(os.path.join(store_dir, TIMESTAMPS_FILE), timestamps)
+        np.save(os.path.join(store_dir, FRAMES_FILE), frames)
+
+        # 메타데이터를 마지막에 기록 - 이 파일이 있으면 저장소가 완성된 것
+        meta = {
+            'version': STORE_VERSION,
+            'video_path': os.path.abspath(video_path),
+            'fingerprint': list(video_fingerprint(video_path)),
+            'regions': [list(region) for region in regions],
+            'frame_skip': frame_skip,
+            'frame_count': count,
+            'crop_sizes': [list(cls.clipped_size(region, width, height)) for region in regions],
+        }
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+
+        print(f"ROI 저장소 생성 완료: {store_dir} ({count}개 프레임 x {len(regions)}개 ROI)")
+        return cls(store_dir)
@@ -1,56 +1,125 @@
 import cv2
+import math
 import os
+import sys
 import pandas as pd
 import numpy as np
 from typing import List, Tuple, Optional
 from tqdm import tqdm
 from config import Config
 from ocr_reader import OCRReader
+from frame_index import FrameIndex, video_fingerprint
+from result_cache import ResultCache, MISS
+from roi_store import ROIStripStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 밝기(Y) 평면이 첫 번째 8비트 평면인 디코더 출력 형식 - 그레이스케일 디코딩에 사용 가능
+GRAY_DECODE_FORMATS = (b'I420', b'IYUV', b'YV12', b'NV12', b'NV21')
 
 class VideoProcessor:
-    def __init__(self, video_path: str, config: Optional[Config] = None):
+    def __init__(self, video_path: str, config: Optional[Config] = None,
+                 ocr_reader: Optional[OCRReader] = None):
         self.video_path = video_path
         self.config = config or Config()
-        self.ocr_reader = OCRReader(self.config.OCR_ENGINE)
+        # 여러 작업을 연달아 처리할 때는 이미 로딩된 OCR 엔진을 재사용할 수 있음
+        self.ocr_reader = ocr_reader or OCRReader(self.config.OCR_ENGINE, self.config)
         self.results = []
         
+        # 프레임 메모리 사용 통계
+        self._frame_buffer = None  # retrieve()가 매번 새 프레임을 할당하지 않도록 재사용
+        self.frames_retrieved = 0
+        self.bytes_retrieved = 0  # retrieve()가 디코더 출력을 프레임 버퍼로 옮긴 바이트 수
+        self.bytes_copied = 0  # 그 이후 단계(그레이스케일 변환, 디버그 이미지)에서 복사된 바이트 수
+        self.gray_decode = False  # BGR 변환 없이 밝기 평면만 디코딩하는지 여부
+        
+        # 실행 간 결과 캐시
+        self.result_cache = None
+        self.video_key = None
+        if self.config.USE_RESULT_CACHE:
+            self.result_cache = ResultCache(self.config.RESULT_CACHE_PATH,
+                                            self.config.RESULT_CACHE_MAX_ENTRIES)
+        
         # 디버그 디렉토리 생성
         if self.config.SAVE_DEBUG_IMAGES:
             os.makedirs(self.config.DEBUG_DIR, exist_ok=True)
     
-    def process_video(self) -> pd.DataFrame:
-        """동영상을 처리하여 숫자를 추출"""
+    def process_video(self, start_frame: int = 0, end_frame: Optional[int] = None) -> pd.DataFrame:
+        """동영상을 처리하여 숫자를 추출
+        
+        start_frame/end_frame을 지정하면 [start_frame, end_frame) 구간만 처리 (분산 처리용)
+        """
         cap = cv2.VideoCapture(self.video_path)
         
         if not cap.isOpened():
             raise ValueError(f"동영상을 열 수 없습니다: {self.video_path}")
         
-        # 동영상 정보 가져오기
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
+        self.gray_decode = self.config.LOW_MEMORY_FRAMES and self.probe_gray_decode(self.video_path)
+        if self.gray_decode:
+            # 디코딩 출력과 프레임 버퍼가 BGR 프레임의 1/3로 줄어듦 (첫 grab 전에 설정해야 함)
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        elif self.config.LOW_MEMORY_FRAMES:
+            print("경고: 이 동영상/백엔드는 그레이스케일 디코딩을 지원하지 않아 전체 BGR 프레임을 디코딩합니다. "
+                  "LOW_MEMORY_FRAMES는 디코딩 이후 단계의 복사만 줄입니다.")
+        
+        self.video_key = ResultCache.video_key(video_fingerprint(self.video_path))
+        
+        # 동영상 정보 가져오기 (프레임 인덱스 사이드카가 있으면 실제 타임스탬프 사용)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        index = FrameIndex.load(self.video_path)
+        if index is not None:
+            fps = index.fps
+            total_frames = index.frame_count
+            duration = float(index.pts[-1]) if total_frames else 0.0
+        else:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
         
         print(f"동영상 정보:")
         print(f"- FPS: {fps}")
         print(f"- 총 프레임 수: {total_frames}")
         print(f"- 길이: {duration:.2f}초")
+        print(f"- 프레임 인덱스: {'사이드카 사용' if index is not None else '없음 (이번 처리 중 생성)'}")
+        
+        # 구간 처리 시에도 전체 처리와 같은 프레임이 샘플링되고 같은 frame_index가 붙도록 함
+        frame_count = start_frame
+        processed_frames = math.ceil(start_frame / self.config.FRAME_SKIP)
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            print(f"- 처리 구간: {start_frame} ~ {end_frame if end_frame is not None else total_frames} 프레임")
         
-        frame_count = 0
-        processed_frames = 0
+        pts = []  # 인덱스가 없을 때 처리하면서 수집하는 프레임별 타임스탬프
+        sampled = []  # 처리한 프레임 번호 (결과 순서와 동일)
+        first_result = len(self.results)
+        reached_end = False
         
         # 진행률 표시
-        pbar = tqdm(total=total_frames, desc="동영상 처리 중")
+        pbar = tqdm(total=max((end_frame if end_frame is not None else total_frames) - start_frame, 0),
+                    desc="동영상 처리 중")
         
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
+            while end_frame is None or frame_count < end_frame:
+                # 모든 프레임은 grab만 하고, 실제로 필요한 프레임만 retrieve(색변환)
+                if not cap.grab():
+                    reached_end = True
                     break
                 
+                if index is None:
+                    pts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                
                 # 지정된 간격으로만 프레임 처리
                 if frame_count % self.config.FRAME_SKIP == 0:
-                    timestamp = frame_count / fps
-                    self._process_frame(frame, timestamp, processed_frames)
+                    if index is not None:
+                        timestamp = index.timestamp(frame_count)
+                    else:
+                        timestamp = pts[-1]
+                    self._process_frame(cap, frame_count, timestamp, processed_frames)
+                    sampled.append(frame_count)
                     processed_frames += 1
                 
                 frame_count += 1
@@ -59,14 +128,214 @@ class VideoProcessor:
         finally:
             cap.release()
             pbar.close()
+            if self.result_cache:
+                self.result_cache.flush()
         
-        print(f"처리 완료: {processed_frames}개 프레임 처리됨")
+        # 전체를 처음부터 끝까지 읽은 경우에만 인덱스를 저장하여 다음 실행부터 재사용
+        if index is None and reached_end and start_frame == 0:
+            index = FrameIndex.from_pts(fps, width, height, FrameIndex.sanitize_pts(pts, fps))
+            try:
+                print(f"프레임 인덱스 저장: {index.save(self.video_path)}")
+            except OSError as e:
+                print(f"프레임 인덱스를 저장할 수 없습니다: {e}")
+            
+            # 백엔드가 타임스탬프를 주지 않아 대체된 경우 결과에도 반영
+            for result, frame_no in zip(self.results[first_result:], sampled):
+                result['timestamp'] = index.timestamp(frame_no)
+        
+        print(f"처리 완료: {len(sampled)}개 프레임 처리됨")
+        if self.result_cache:
+            print(f"결과 캐시: {self.result_cache.hits}개 재사용, {self.result_cache.misses}개 새로 인식")
+        self._print_memory_stats()
         return self._create_dataframe()
     
-    def _process_frame(self, frame: np.ndarray, timestamp: float, frame_idx: int):
-        """개별 프레임 처리"""
+    def process_roi_store(self, store_dir: str, shard_index: int = 0, shard_count: int = 1) -> pd.DataFrame:
+        """ROI 저장소에서 직접 숫자 추출 (동영상 디코딩 없음)
+        
+        shard_count > 1 이면 shard_index번째 몫(position % shard_count == shard_index)만 처리
+        """
+        store = ROIStripStore(store_dir)
+        regions = [tuple(self.config.ROI_REGION_1), tuple(self.config.ROI_REGION_2)]
+        if store.regions != regions:
+            raise ValueError(f"ROI 저장소의 ROI {store.regions}가 현재 설정 {regions}와 다릅니다. "
+                             f"--build-roi-store로 저장소를 다시 만드세요.")
+        
+        # 원본 동영상이 없는 장비에서도 같은 결과 캐시 키를 쓰도록 저장소의 식별값 사용
+        self.video_key = ResultCache.video_key(store.fingerprint)
+        
+        positions = range(shard_index, store.frame_count, shard_count)
+        print(f"ROI 저장소: {store_dir} ({store.frame_count}개 프레임, 샤드 {shard_index + 1}/{shard_count}: {len(positions)}개)")
+        
+        try:
+            for position in tqdm(positions, desc="ROI 저장소 처리 중"):
+                frame_no = int(store.frames[position])
+                numbers = []
+                for r, region in enumerate(regions):
+                    number = self._cached_result(frame_no, region)
+                    if number is MISS:
+                        number = self._recognize(store.crop(position, r), frame_no, region)
+                    numbers.append(number)
+                
+                self.results.append({
+                    'timestamp': float(store.timestamps[position]),
+                    'frame_index': position,
+                    'number_1': numbers[0],
+                    'number_2': numbers[1]
+                })
+        finally:
+            if self.result_cache:
+                self.result_cache.flush()
+        
+        print(f"처리 완료: {len(positions)}개 프레임 처리됨")
+        if self.result_cache:
+            print(f"결과 캐시: {self.result_cache.hits}개 재사용, {self.result_cache.misses}개 새로 인식")
+        return self._create_dataframe()
+    
+    def _print_memory_stats(self):
+        """프레임당 복사량과 최대 메모리 사용량(RSS) 출력"""
+        if self.frames_retrieved:
+            retrieved = self.bytes_retrieved / self.frames_retrieved
+            copied = self.bytes_copied / self.frames_retrieved
+            print(f"프레임당 복사량: 디코딩 출력 {retrieved / 1024:.1f}KB "
+                  f"({'그레이스케일' if self.gray_decode else 'BGR'}) + 이후 단계 {copied / 1024:.1f}KB "
+                  f"({'ROI별 그레이스케일' if self.config.LOW_MEMORY_FRAMES else '전체 프레임'} 경로)")
+        
+        peak_rss = self.peak_rss_mb()
+        if peak_rss is not None:
+            print(f"최대 메모리 사용량(RSS): {peak_rss:.1f}MB")
+    
+    @staticmethod
+    def peak_rss_mb() -> Optional[float]:
+        """프로세스 최대 RSS (MB) - 지원하지 않는 플랫폼에서는 None"""
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux는 KB, macOS는 바이트 단위
+        if sys.platform == 'darwin':
+            return peak / 1024 / 1024
+        return peak / 1024
+    
+    @staticmethod
+    def region_view(frame: np.ndarray, region: Tuple[int, int, int, int]) -> np.ndarray:
+        """프레임 경계로 잘린 ROI 영역 (복사 없는 뷰)"""
+        x, y, w, h = region
+        return frame[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)]
+    
+    @staticmethod
+    def crop_regions(frame: np.ndarray, regions: List[Tuple], limited_range: bool = False) -> List[np.ndarray]:
+        """ROI마다 따로 잘라 각각의 작은 그레이스케일 버퍼로 변환
+        
+        모든 ROI를 포함하는 영역을 한 번에 자르면 ROI가 멀리 떨어져 있을 때 거의 전체 프레임을
+        변환하게 되므로 ROI 면적만큼만 변환함
+        limited_range: frame이 디코더의 밝기 평면(16~235)이면 BGR→그레이스케일과 같은 0~255 범위로 늘림
+        """
+        crops = []
+        for region in regions:
+            roi = VideoProcessor.region_view(frame, region)
+            if roi.size == 0:
+                crops.append(np.zeros((0, 0), dtype=np.uint8))
+            elif roi.ndim == 3:
+                crops.append(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY))
+            elif limited_range:
+                crops.append(cv2.convertScaleAbs(roi, alpha=255 / 219, beta=-16 * 255 / 219))
+            else:
+                crops.append(roi.copy())
+        return crops
+    
+    @staticmethod
+    def probe_gray_decode(video_path: str) -> bool:
+        """BGR 변환 없이 밝기(Y) 평면만 그레이스케일 프레임으로 디코딩할 수 있는지 확인
+        
+        OpenCV의 FFmpeg 백엔드는 CAP_PROP_CONVERT_RGB=0이면 디코더 출력의 첫 번째 평면을 그대로
+        내주므로, 8비트 YUV 형식이고 실제로 꺼낸 프레임이 전체 해상도의 1채널일 때만 사용함
+        (처리 도중에는 변환 설정을 바꿀 수 없으므로 별도 캡처로 한 프레임만 시험)
+        """
+        prop = getattr(cv2, 'CAP_PROP_CODEC_PIXEL_FORMAT', None)
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if prop is None or not cap.isOpened():
+                return False
+            pixel_format = (int(cap.get(prop)) & 0xFFFFFFFF).to_bytes(4, 'little')
+            if pixel_format not in GRAY_DECODE_FORMATS or not cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+                return False
+            ret, frame = VideoProcessor._retrieve_quietly(cap, None) if cap.grab() else (False, None)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            return bool(ret) and frame.dtype == np.uint8 and frame.shape == (height, width)
+        finally:
+            cap.release()
+    
+    @staticmethod
+    def _retrieve_quietly(cap: cv2.VideoCapture, buffer: Optional[np.ndarray]):
+        """retrieve - 그레이스케일 디코딩 시 백엔드가 매 프레임 출력하는 형식 경고는 숨김"""
+        logging = getattr(getattr(cv2, 'utils', None), 'logging', None)
+        if logging is None:
+            return cap.retrieve(buffer)
+        level = logging.getLogLevel()
+        logging.setLogLevel(logging.LOG_LEVEL_ERROR)
+        try:
+            return cap.retrieve(buffer)
+        finally:
+            logging.setLogLevel(level)
+    
+    @staticmethod
+    def _tile_crops(crops: List[np.ndarray], gap: int = 10) -> Tuple[np.ndarray, List[Tuple]]:
+        """디버그 이미지용으로 ROI 크롭을 가로로 나란히 붙임 - (이미지, 이미지 기준 ROI 좌표)"""
+        height = max((crop.shape[0] for crop in crops), default=0)
+        width = sum(crop.shape[1] for crop in crops) + gap * max(len(crops) - 1, 0)
+        tiled = np.zeros((height, width), dtype=np.uint8)
+        
+        regions = []
+        x = 0
+        for crop in crops:
+            h, w = crop.shape[:2]
+            tiled[:h, x:x+w] = crop
+            regions.append((x, 0, w, h))
+            x += w + gap
+        return tiled, regions
+    
+    def _process_frame(self, cap: cv2.VideoCapture, frame_no: int, timestamp: float, frame_idx: int):
+        """개별 프레임 처리 - 캐시에 없는 ROI만 OCR 수행"""
         regions = [self.config.ROI_REGION_1, self.config.ROI_REGION_2]
-        number1, number2 = self.ocr_reader.extract_from_regions(frame, regions)
+        numbers = [self._cached_result(frame_no, region) for region in regions]
+        missing = [i for i, number in enumerate(numbers) if number is MISS]
+        save_debug = self.config.SAVE_DEBUG_IMAGES and frame_idx % 10 == 0  # 10프레임마다 저장
+        
+        # 모든 ROI가 캐시에 있으면 디코딩된 프레임을 꺼내지 않음
+        frame = None
+        crops = {}  # ROI 번호 -> OCR에 넘길 이미지
+        if missing or save_debug:
+            if self.gray_decode:
+                ret, frame = self._retrieve_quietly(cap, self._frame_buffer)
+            else:
+                ret, frame = cap.retrieve(self._frame_buffer)
+            if ret:
+                self._frame_buffer = frame
+                self.frames_retrieved += 1
+                self.bytes_retrieved += frame.nbytes
+                if self.config.LOW_MEMORY_FRAMES:
+                    # 이후 단계는 전체 프레임 대신 ROI별 작은 그레이스케일 버퍼만 사용
+                    # (그레이스케일로 디코딩된 경우 색변환 없이 ROI 영역의 밝기 범위만 맞추고,
+                    #  전처리는 그레이스케일 입력을 그대로 사용하므로 추가 변환 없음)
+                    wanted = list(range(len(regions))) if save_debug else missing
+                    crops = dict(zip(wanted, self.crop_regions(frame, [regions[i] for i in wanted],
+                                                               limited_range=self.gray_decode)))
+                    self.bytes_copied += sum(crop.nbytes for crop in crops.values())
+                    frame = None
+                else:
+                    # 전체 프레임의 뷰를 넘기고 전처리에서 ROI마다 그레이스케일 변환 복사가 일어남
+                    crops = {i: self.region_view(frame, regions[i]) for i in missing}
+                    self.bytes_copied += sum(crops[i].shape[0] * crops[i].shape[1] for i in missing)
+            else:
+                frame = None
+        
+        for i in missing:
+            if i not in crops:
+                numbers[i] = None  # 프레임을 꺼내지 못함
+                continue
+            numbers[i] = self._recognize(crops[i], frame_no, regions[i])
+        
+        number1, number2 = numbers
         
         # 결과 저장
         result = {
@@ -78,13 +347,49 @@ class VideoProcessor:
         self.results.append(result)
         
         # 디버그 이미지 저장
-        if self.config.SAVE_DEBUG_IMAGES and frame_idx % 10 == 0:  # 10프레임마다 저장
+        if save_debug and frame is not None:
             self._save_debug_frame(frame, regions, frame_idx, number1, number2)
+        elif save_debug and crops:
+            # 전체 프레임 대신 ROI 크롭을 나란히 붙인 작은 이미지로 저장
+            tiled, tiled_regions = self._tile_crops([crops[i] for i in range(len(regions))])
+            self._save_debug_frame(tiled, tiled_regions, frame_idx, number1, number2)
+    
+    def _recognize(self, image: np.ndarray, frame_no: int, region: Tuple[int, int, int, int]) -> Optional[str]:
+        """ROI 하나를 OCR하고 성공한 결과만 결과 캐시에 저장
+        
+        엔진 오류(설치되지 않은 tesseract 등)를 "숫자 없음"으로 저장하면 엔진을 고친 뒤에도
+        계속 재사용되므로, 오류는 이번 결과에서만 None으로 두고 캐시하지 않음
+        """
+        try:
+            number = self.ocr_reader.extract_numbers(image, strict=True)
+        except Exception as e:
+            print(f"OCR 처리 중 오류: {e}")
+            return None
+        
+        if self.result_cache:
+            self.result_cache.put(self.video_key, frame_no, region,
+                                  self.ocr_reader.engine, self.ocr_reader.signature, number)
+        return number
+    
+    def _cached_result(self, frame_no: int, region: Tuple[int, int, int, int]):
+        """결과 캐시 조회 - 캐시를 쓰지 않거나 없으면 MISS"""
+        if self.result_cache is None:
+            return MISS
+        return self.result_cache.get(self.video_key, frame_no, region,
+                                     self.ocr_reader.engine, self.ocr_reader.signature)
     
     def _save_debug_frame(self, frame: np.ndarray, regions: List[Tuple], 
                          frame_idx: int, number1: Optional[str], number2: Optional[str]):
         """디버그용 프레임 저장"""
-        debug_frame = frame.copy()
+        if frame.ndim == 2:
+            # ROI 크롭을 붙인 그레이스케일 이미지는 컬러로 변환하고 위쪽에 글자 표시용 여백 추가
+            margin = 80
+            debug_frame = cv2.copyMakeBorder(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR),
+                                             margin, 0, 0, 0, cv2.BORDER_CONSTANT, value=(0, 0, 0))
+            regions = [(x, y + margin, w, h) for x, y, w, h in regions]
+        else:
+            debug_frame = frame.copy()
+        self.bytes_copied += debug_frame.nbytes
         
         # ROI 영역 표시
         for i, (x, y, w, h) in enumerate(regions):
@@ -5,18 +5,23 @@ import cv2
 import numpy as np
 from typing import Tuple, Optional, List
 from config import Config
+from frame_index import FrameIndex
+from frame_cache import CachedFrameReader
+from ocr_preview import OCRPreviewWorker
 
 class VideoROIEditor:
     def __init__(self, video_path: str, config: Optional[Config] = None):
         self.video_path = video_path
         self.config = config or Config()
-        self.cap = None
+        self.reader = None
+        self.index = None
         self.current_frame = None
         self.frame_count = 0
         self.total_frames = 0
         self.fps = 30
         self.playing = False
         self.paused = True
+        self.pending_seek = None  # 트랙바에서 요청된 프레임 번호
         
         # ROI 설정
         self.roi_regions = [
@@ -33,6 +38,13 @@ class VideoROIEditor:
         # UI 상태
         self.show_roi = True
         self.window_name = "Video ROI Editor"
+        self.trackbar_name = "Frame"
+        
+        # OCR 미리보기 상태
+        self.show_ocr_preview = self.config.LIVE_OCR_PREVIEW
+        self.ocr_worker = None
+        self.ocr_state = None  # 마지막으로 OCR 워커에 제출한 (프레임 번호, ROI) 상태
+        self.preview_width = 320
         
         # 색상 정의
         self.roi_colors = [(0, 255, 0), (0, 0, 255)]  # 초록, 빨강
@@ -40,18 +52,23 @@ class VideoROIEditor:
     
     def _init_video(self):
         """동영상 초기화"""
-        self.cap = cv2.VideoCapture(self.video_path)
-        if not self.cap.isOpened():
-            raise ValueError(f"동영상을 열 수 없습니다: {self.video_path}")
+        self.index = FrameIndex.from_video(self.video_path)
+        self.total_frames = self.index.frame_count
+        self.fps = self.index.fps
         
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.reader = CachedFrameReader(self.video_path, self.index,
+                                        self.config.FRAME_CACHE_MB * 1024 * 1024,
+                                        self.config.PREFETCH_FRAMES)
         
         # 첫 번째 프레임 읽기
-        ret, self.current_frame = self.cap.read()
-        if not ret:
+        if not self._seek(0):
             raise ValueError("첫 번째 프레임을 읽을 수 없습니다.")
     
+    def _on_trackbar(self, pos):
+        """트랙바 이동 콜백 - 실제 탐색은 메인 루프에서 처리"""
+        if pos != self.frame_count:
+            self.pending_seek = pos
+    
     def _mouse_callback(self, event, x, y, flags, param):
         """마우스 이벤트 콜백"""
         if event == cv2.EVENT_LBUTTONDOWN:
@@ -102,10 +119,10 @@ class VideoROIEditor:
     
     def _draw_roi_overlay(self, frame):
         """ROI 오버레이 그리기"""
-        if not self.show_roi:
-            return frame
-        
+        # 캐시된 프레임은 읽기 전용이므로 ROI 표시 여부와 관계없이 복사본에 그림
         overlay_frame = frame.copy()
+        if not self.show_roi:
+            return overlay_frame
         
         for i, (x, y, w, h) in enumerate(self.roi_regions):
             color = self.roi_colors[i]
@@ -128,6 +145,69 @@ class VideoROIEditor:
         
         return overlay_frame
     
+    def _update_ocr_preview(self):
+        """프레임이나 ROI가 바뀌었으면 OCR 워커에 최신 상태 제출"""
+        if not self.show_ocr_preview or self.current_frame is None:
+            return
+        
+        if self.ocr_worker is None:
+            self.ocr_worker = OCRPreviewWorker(self.config.OCR_ENGINE, self.config)
+        
+        state = (self.frame_count, tuple(tuple(roi) for roi in self.roi_regions))
+        if state == self.ocr_state:
+            return
+        
+        # 재생 중에는 이전 결과가 나온 뒤에만 제출 (매 프레임 취소되어 결과가 갱신되지 않는 것을 방지)
+        if self.playing and not self.paused and self.ocr_worker.pending and self.ocr_state is not None:
+            return
+        
+        self.ocr_state = state
+        self.ocr_worker.submit(self.current_frame, self.roi_regions)
+    
+    def _draw_ocr_preview(self, frame):
+        """프레임 오른쪽에 ROI별 이진화 이미지와 인식 결과 패널 붙이기"""
+        if not self.show_ocr_preview or self.ocr_worker is None:
+            return frame
+        
+        h = frame.shape[0]
+        panel = np.zeros((h, self.preview_width, 3), dtype=np.uint8)
+        margin = 10
+        thumb_max_h = 120
+        
+        if self.ocr_worker.error:
+            cv2.putText(panel, "OCR unavailable", (margin, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            return np.hstack([frame, panel])
+        
+        status = "OCR: ..." if self.ocr_worker.pending else "OCR: ready"
+        cv2.putText(panel, status, (margin, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        
+        results = self.ocr_worker.latest() or []
+        y = 50
+        for i, name in enumerate(self.roi_names):
+            binary, value = results[i] if i < len(results) else (None, None)
+            color = self.roi_colors[i]
+            
+            cv2.putText(panel, f"{name}: {value or 'None'}", (margin, y + 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            y += 35
+            
+            if binary is not None and y < h:
+                # 패널 크기에 맞게 비율 유지 축소
+                bh, bw = binary.shape[:2]
+                scale = min((self.preview_width - 2 * margin) / bw, thumb_max_h / bh)
+                thumb = cv2.resize(binary, (max(int(bw * scale), 1), max(int(bh * scale), 1)),
+                                   interpolation=cv2.INTER_AREA)
+                thumb = cv2.cvtColor(thumb, cv2.COLOR_GRAY2BGR)
+                th, tw = thumb.shape[:2]
+                th = min(th, h - y)
+                panel[y:y+th, margin:margin+tw] = thumb[:th]
+                cv2.rectangle(panel, (margin, y), (margin + tw, y + th), color, 1)
+                y += th + 20
+        
+        return np.hstack([frame, panel])
+    
     def _draw_ui_info(self, frame):
         """UI 정보 그리기"""
         h, w = frame.shape[:2]
@@ -138,51 +218,72 @@ class VideoROIEditor:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # 프레임 정보
-        cv2.putText(frame, f"Frame: {self.frame_count}/{self.total_frames}", (10, 60),
+        timestamp = self.index.timestamp(self.frame_count) if self.index else 0.0
+        cv2.putText(frame, f"Frame: {self.frame_count}/{self.total_frames} ({timestamp:.2f}s)", (10, 60),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # 도움말
         help_text = [
             "Controls:",
             "SPACE: Play/Pause",
+            "A/D: -1s/+1s",
+            "Shift+A/D: -10s/+10s",
             "R: Reset ROI",
             "S: Save ROI",
+            "O: Toggle OCR Preview",
             "H: Toggle Help",
             "Q: Quit"
         ]
         
         for i, text in enumerate(help_text):
-            cv2.putText(frame, text, (10, h - 150 + i * 25),
+            cv2.putText(frame, text, (10, h - 25 * len(help_text) + i * 25),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         return frame
     
+    def _seek(self, frame_idx):
+        """지정한 프레임으로 이동 (캐시/키프레임 인덱스 사용)"""
+        if self.reader is None:
+            return False
+        
+        frame_idx = min(max(frame_idx, 0), max(self.total_frames - 1, 0))
+        frame = self.reader.read(frame_idx)
+        if frame is None:
+            return False
+        
+        self.current_frame = frame
+        self.frame_count = frame_idx
+        
+        # 트랙바 위치 동기화 (창이 만들어지기 전에는 무시)
+        try:
+            cv2.setTrackbarPos(self.trackbar_name, self.window_name, frame_idx)
+        except cv2.error:
+            pass
+        return True
+    
+    def _seek_seconds(self, seconds):
+        """현재 위치에서 지정한 초만큼 이동"""
+        target = self.index.frame_at(self.index.timestamp(self.frame_count) + seconds)
+        self._seek(target)
+    
     def _get_next_frame(self):
         """다음 프레임 가져오기"""
-        if self.cap is None:
+        if self.reader is None:
             return False
         
-        ret, frame = self.cap.read()
-        if ret:
-            self.current_frame = frame
-            self.frame_count += 1
+        next_idx = self.frame_count + 1
+        if next_idx < self.total_frames and self._seek(next_idx):
             return True
-        else:
-            # 동영상 끝에 도달하면 처음으로 돌아가기
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            self.frame_count = 0
-            ret, frame = self.cap.read()
-            if ret:
-                self.current_frame = frame
-                self.frame_count += 1
-                return True
-        
-        return False
+        
+        # 동영상 끝에 도달하면 처음으로 돌아가기
+        return self._seek(0)
     
     def _save_roi_config(self):
         """ROI 설정을 config.py에 저장"""
         try:
             config_content = f"""# 동영상 처리 설정
+import json
+
 class Config:
     def __init__(self):
         # ROI (Region of Interest) 설정 - 숫자가 나타나는 영역
@@ -194,15 +295,48 @@ class Config:
         self.OCR_ENGINE = "{self.config.OCR_ENGINE}"  # "easyocr" 또는 "tesseract"
         self.TESSERACT_CONFIG = '{self.config.TESSERACT_CONFIG}'
         
+        # OCR 전처리 설정 (--tune으로 만든 프로파일로 덮어쓸 수 있음)
+        self.PREPROCESS_SCALE = {self.config.PREPROCESS_SCALE}  # 확대 배율
+        self.PREPROCESS_BLUR = {self.config.PREPROCESS_BLUR}  # 미디언 블러 커널 크기 (0: 사용 안 함)
+        self.PREPROCESS_THRESHOLD = "{self.config.PREPROCESS_THRESHOLD}"  # "otsu", "adaptive" 또는 "none"
+        self.PREPROCESS_CLOSE = {self.config.PREPROCESS_CLOSE}  # 닫힘 연산 커널 크기 (0: 사용 안 함)
+        self.OCR_SKIP_DETECTION = {self.config.OCR_SKIP_DETECTION}  # EasyOCR 글자 영역 검출을 건너뛰고 ROI 전체를 한 줄로 인식
+        
         # 프레임 처리 설정
         self.FRAME_SKIP = {self.config.FRAME_SKIP}  # 30프레임마다 처리 (1초마다, 30fps 기준)
         
+        # ROI 편집기 탐색 설정
+        self.FRAME_CACHE_MB = {self.config.FRAME_CACHE_MB}  # 디코딩된 프레임 캐시 메모리 한도 (MB)
+        self.PREFETCH_FRAMES = {self.config.PREFETCH_FRAMES}  # 현재 위치 앞뒤로 미리 디코딩할 프레임 수
+        self.LIVE_OCR_PREVIEW = {self.config.LIVE_OCR_PREVIEW}  # 편집 중 ROI별 OCR 결과 미리보기
+        
+        # 결과 캐시 설정 (동영상/프레임/ROI/엔진/전처리가 같으면 이전 OCR 결과 재사용)
+        self.USE_RESULT_CACHE = {self.config.USE_RESULT_CACHE}
+        self.RESULT_CACHE_PATH = "{self.config.RESULT_CACHE_PATH}"
+        self.RESULT_CACHE_MAX_ENTRIES = {self.config.RESULT_CACHE_MAX_ENTRIES}  # 초과 시 가장 오래 사용되지 않은 결과부터 삭제
+        
+        # 프레임 메모리 설정
+        self.LOW_MEMORY_FRAMES = {self.config.LOW_MEMORY_FRAMES}  # ROI 영역만 잘라 사용 (지원하는 백엔드에서는 BGR 대신 그레이스케일로 디코딩)
+        
+        # 분산 처리 설정 (--worker)
+        self.WORKER_HEARTBEAT_SEC = {self.config.WORKER_HEARTBEAT_SEC}  # 처리 중 작업의 임대 갱신 간격 (초)
+        self.WORKER_LEASE_SEC = {self.config.WORKER_LEASE_SEC}  # 이 시간 동안 하트비트가 없으면 작업을 다시 대기열로
+        self.WORKER_MAX_ATTEMPTS = {self.config.WORKER_MAX_ATTEMPTS}  # 이 횟수만큼 실패하면 failed로 이동
+        self.WORKER_POLL_SEC = {self.config.WORKER_POLL_SEC}  # 가져올 작업이 없을 때 대기 간격 (초)
+        
         # 출력 설정
         self.OUTPUT_CSV = "{self.config.OUTPUT_CSV}"
         
         # 디버그 설정
         self.SAVE_DEBUG_IMAGES = {self.config.SAVE_DEBUG_IMAGES}
         self.DEBUG_DIR = "{self.config.DEBUG_DIR}"
+    
+    def load_profile(self, path):
+        \"\"\"자동 튜너가 만든 프로파일(JSON)의 설정값 적용\"\"\"
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+        for key, value in profile['config'].items():
+            setattr(self, key, value)
 """
             
             with open('config.py', 'w', encoding='utf-8') as f:
@@ -230,28 +364,42 @@ class Config:
             
             cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE)
             cv2.setMouseCallback(self.window_name, self._mouse_callback)
+            cv2.createTrackbar(self.trackbar_name, self.window_name, 0,
+                               max(self.total_frames - 1, 1), self._on_trackbar)
             
             print("=== Video ROI Editor ===")
             print("조작법:")
             print("- 마우스로 ROI 영역을 드래그하여 이동")
+            print("- 트랙바: 원하는 프레임으로 이동")
             print("- SPACE: 재생/일시정지")
+            print("- A/D: 1초 뒤로/앞으로, Shift+A/D: 10초 뒤로/앞으로")
             print("- R: ROI 리셋")
             print("- S: ROI 설정 저장")
+            print("- O: OCR 미리보기 켜기/끄기")
             print("- Q: 종료")
             print("========================")
             
             while True:
-                if self.playing and not self.paused:
+                if self.pending_seek is not None:
+                    target, self.pending_seek = self.pending_seek, None
+                    self._seek(target)
+                elif self.playing and not self.paused:
                     if not self._get_next_frame():
                         break
                 
                 if self.current_frame is not None:
+                    # 변경된 ROI/프레임을 OCR 워커에 제출 (UI 루프는 기다리지 않음)
+                    self._update_ocr_preview()
+                    
                     # ROI 오버레이 그리기
                     display_frame = self._draw_roi_overlay(self.current_frame)
                     
                     # UI 정보 그리기
                     display_frame = self._draw_ui_info(display_frame)
                     
+                    # OCR 미리보기 패널 붙이기
+                    display_frame = self._draw_ocr_preview(display_frame)
+                    
                     cv2.imshow(self.window_name, display_frame)
                 
                 # 키 입력 처리
@@ -265,10 +413,21 @@ class Config:
                     else:
                         self.playing = True
                         self.paused = False
+                elif key == ord('a'):  # A: 1초 뒤로
+                    self._seek_seconds(-1)
+                elif key == ord('d'):  # D: 1초 앞으로
+                    self._seek_seconds(1)
+                elif key == ord('A'):  # Shift+A: 10초 뒤로
+                    self._seek_seconds(-10)
+                elif key == ord('D'):  # Shift+D: 10초 앞으로
+                    self._seek_seconds(10)
                 elif key == ord('r'):  # R
                     self._reset_roi()
                 elif key == ord('s'):  # S
                     self._save_roi_config()
+                elif key == ord('o'):  # O
+                    self.show_ocr_preview = not self.show_ocr_preview
+                    self.ocr_state = None
                 elif key == ord('h'):  # H
                     self.show_roi = not self.show_roi
         
@@ -276,8 +435,10 @@ class Config:
             print(f"오류 발생: {e}")
         
         finally:
-            if self.cap:
-                self.cap.release()
+            if self.reader:
+                self.reader.close()
+            if self.ocr_worker:
+                self.ocr_worker.close()
             cv2.destroyAllWindows()
 
 def main():
@@ -0,0 +1,357 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from frame_index import FrameIndex, video_fingerprint
+from ocr_reader import OCRReader
+from video_processor import VideoProcessor
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+RESULTS = "results"
+LAYOUTS = "layouts"
+
+# 결과 값에 영향을 주는 설정 - 이 값이나 구간 경계가 바뀌면 다른 작업으로 등록
+RESULT_CONFIG_KEYS = ("ROI_REGION_1", "ROI_REGION_2", "OCR_ENGINE", "TESSERACT_CONFIG",
+                      "PREPROCESS_SCALE", "PREPROCESS_BLUR", "PREPROCESS_THRESHOLD",
+                      "PREPROCESS_CLOSE", "OCR_SKIP_DETECTION", "FRAME_SKIP")
+
+
+class _Heartbeat:
+    """처리 중인 작업 파일의 수정 시각을 주기적으로 갱신하여 임대 유지"""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self.lost = False  # 다른 워커가 만료된 작업으로 보고 가져간 경우
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                self.lost = True
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class WorkQueue:
+    """공유 파일시스템의 작업 디렉토리로 조율하는 분산 작업 큐 (별도 브로커 없음)
+
+    작업 상태는 파일이 놓인 하위 디렉토리로 표현하고, 상태 전환은 모두 같은 파일시스템 안의
+    os.rename(원자적)으로만 수행하므로 여러 장비의 워커가 동시에 같은 작업을 가져가지 않음
+    - pending/<작업>.json: 대기 중
+    - claimed/<작업>@<워커>.json: 처리 중 (파일 수정 시각이 하트비트)
+    - done/<작업>.json, failed/<작업>.json: 완료/실패
+    - results/<작업>.csv: 작업별 결과
+    - layouts/<동영상>.json: 동영상별 마지막으로 등록한 구간/설정 (--collect는 이 작업들만 합침)
+    """
+
+    def __init__(self, queue_dir: str, worker_id: Optional[str] = None):
+        self.queue_dir = queue_dir
+        if worker_id is None:
+            worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # 파일 이름 구분자로 쓰는 문자는 워커 이름에서 제거
+        self.worker_id = worker_id.replace('@', '-').replace(os.sep, '-')
+
+        for state in (PENDING, CLAIMED, DONE, FAILED, RESULTS, LAYOUTS):
+            os.makedirs(self._path(state), exist_ok=True)
+
+    def _path(self, state: str, name: str = "") -> str:
+        return os.path.join(self.queue_dir, state, name)
+
+    def _jobs(self, state: str) -> List[str]:
+        return sorted(glob.glob(self._path(state, "*.json")))
+
+    @staticmethod
+    def _read_json(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: str, data: Dict):
+        """임시 파일에 쓴 뒤 교체하여 다른 워커가 반쯤 쓰인 파일을 읽지 않도록 함"""
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def status(self) -> Dict[str, int]:
+        """상태별 작업 수"""
+        return {state: len(self._jobs(state)) for state in (PENDING, CLAIMED, DONE, FAILED)}
+
+    def enqueue(self, video_path: str, config: Config, segments: int = 1) -> List[str]:
+        """동영상을 작업으로 등록 - segments > 1 이면 프레임 구간별 작업으로 나눔"""
+        video_path = os.path.abspath(video_path)
+        size, mtime = video_fingerprint(video_path)
+        digest = hashlib.sha1(f"{video_path}:{size}:{mtime}".encode('utf-8')).hexdigest()[:8]
+        base_id = f"{Path(video_path).stem}-{digest}"
+
+        bounds = [(0, None)]
+        if segments > 1:
+            # 정확한 프레임 수가 필요하므로 인덱스를 만들어 두면 워커들도 같은 사이드카를 사용함
+            index = FrameIndex.load_or_scan(video_path)
+            samples = math.ceil(index.frame_count / config.FRAME_SKIP)
+            # 구간 경계를 FRAME_SKIP 배수에 맞춰 전체 처리와 같은 프레임이 샘플링되도록 함
+            length = max(math.ceil(samples / segments), 1) * config.FRAME_SKIP
+            starts = list(range(0, index.frame_count, length)) or [0]
+            # 마지막 구간은 끝을 지정하지 않아 실제 마지막 프레임까지 처리
+            bounds = [(start, start + length if i < len(starts) - 1 else None)
+                      for i, start in enumerate(starts)]
+
+        # 구간 경계와 결과에 영향을 주는 설정이 같을 때만 같은 작업 ID가 되도록 함
+        # (세그먼트 번호만 쓰면 다른 --segments나 ROI로 다시 등록할 때 이전 작업과 섞임)
+        result_config = {key: getattr(config, key) for key in RESULT_CONFIG_KEYS}
+        layout_key = json.dumps({'bounds': bounds, 'config': result_config}, sort_keys=True)
+        layout = f"{base_id}-{hashlib.sha1(layout_key.encode('utf-8')).hexdigest()[:8]}"
+        self._set_layout(base_id, layout, len(bounds))
+
+        job_ids = []
+        for i, (start, end) in enumerate(bounds):
+            job_id = f"{layout}-{i:03d}"
+            if (os.path.exists(self._path(PENDING, f"{job_id}.json"))
+                    or os.path.exists(self._path(DONE, f"{job_id}.json"))
+                    or glob.glob(self._path(CLAIMED, f"{job_id}@*.json"))):
+                print(f"이미 등록된 작업이므로 건너뜁니다: {job_id}")
+                continue
+
+            job = {
+                'id': job_id,
+                'video_id': base_id,
+                'layout': layout,
+                'video_path': video_path,
+                'fingerprint': [size, mtime],
+                'start_frame': start,
+                'end_frame': end,
+                'attempts': 0,
+                'max_attempts': config.WORKER_MAX_ATTEMPTS,
+                'lease_sec': config.WORKER_LEASE_SEC,
+                'errors': [],
+                'config': dict(vars(config)),
+            }
+            self._write_json(self._path(PENDING, f"{job_id}.json"), job)
+            # 이전에 실패했던 같은 작업은 새로 등록한 것으로 대체
+            if os.path.exists(self._path(FAILED, f"{job_id}.json")):
+                os.remove(self._path(FAILED, f"{job_id}.json"))
+            job_ids.append(job_id)
+
+        return job_ids
+
+    def _set_layout(self, video_id: str, layout: str, segments: int):
+        """동영상의 현재 구간/설정을 기록하고, 이전 설정으로 대기 중인 작업은 제거"""
+        path = self._path(LAYOUTS, f"{video_id}.json")
+        if os.path.exists(path):
+            previous = self._read_json(path)['layout']
+            if previous != layout:
+                print(f"이전과 다른 구간/설정으로 등록합니다. 이전 설정({previous})의 결과는 --collect에서 제외됩니다.")
+                for job_path in self._jobs(PENDING):
+                    if Path(job_path).stem.startswith(f"{video_id}-") and not Path(job_path).stem.startswith(f"{layout}-"):
+                        try:
+                            os.remove(job_path)
+                        except FileNotFoundError:
+                            pass  # 그 사이 워커가 가져감 (완료되어도 합칠 때 제외됨)
+        self._write_json(path, {'layout': layout, 'segments': segments})
+
+    def claim(self) -> Optional[Tuple[str, Dict]]:
+        """대기 중인 작업 하나를 가져옴 - (처리 중 파일 경로, 작업) 또는 None"""
+        for path in self._jobs(PENDING):
+            job_id = Path(path).stem
+            claimed = self._path(CLAIMED, f"{job_id}@{self.worker_id}.json")
+            try:
+                # 이름을 바꿔도 수정 시각은 유지되므로 임대 시작 시각을 먼저 갱신
+                os.utime(path)
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # 다른 워커가 먼저 가져감
+            return claimed, self._read_json(claimed)
+        return None
+
+    def requeue_expired(self) -> int:
+        """하트비트가 끊긴(임대 만료) 작업을 다시 대기열로 돌려놓음"""
+        requeued = 0
+        now = time.time()
+        for path in self._jobs(CLAIMED):
+            try:
+                mtime = os.path.getmtime(path)
+                job = self._read_json(path)
+            except (FileNotFoundError, ValueError):
+                continue
+            if now - mtime <= job['lease_sec']:
+                continue
+
+            # 다른 워커와 동시에 회수하지 않도록 먼저 자신의 이름으로 가져온 뒤 처리
+            mine = self._path(CLAIMED, f"{job['id']}@{self.worker_id}.json")
+            try:
+                os.utime(path)
+                os.rename(path, mine)
+            except FileNotFoundError:
+                continue
+
+            print(f"임대 만료 작업 회수: {os.path.basename(path)}")
+            self.release(mine, job, f"임대 만료 ({os.path.basename(path)}, 워커 중단 추정)")
+            requeued += 1
+        return requeued
+
+    def _take(self, path: str, job: Dict) -> Optional[str]:
+        """처리 중 파일을 이 워커만 아는 이름으로 옮겨 소유권 확보 - 임대를 잃었으면 None
+
+        내용을 먼저 다시 쓰면(os.replace) 그 사이 다른 워커가 회수해 간 파일이 되살아나므로
+        원자적인 rename으로 파일을 가져온 뒤에만 내용을 갱신함
+        """
+        private = self._path(CLAIMED, f"{job['id']}@{self.worker_id}-{uuid.uuid4().hex[:8]}.json")
+        try:
+            # 내용을 갱신하는 동안 만료된 작업으로 보이지 않도록 수정 시각부터 갱신
+            # (도중에 워커가 중단되면 임대 만료 후 다른 워커가 회수함)
+            os.utime(path)
+            os.rename(path, private)
+        except FileNotFoundError:
+            return None
+        return private
+
+    def release(self, path: str, job: Dict, error: str):
+        """처리하지 못한 작업을 다시 대기열로 (재시도 횟수를 넘으면 실패로) 이동"""
+        private = self._take(path, job)
+        if private is None:
+            return  # 그 사이 다른 워커가 가져감
+
+        job['attempts'] += 1
+        job['errors'].append(f"{self.worker_id}: {error}")
+        state = FAILED if job['attempts'] >= job['max_attempts'] else PENDING
+        self._write_json(private, job)
+        os.rename(private, self._path(state, f"{job['id']}.json"))
+        if state == FAILED:
+            print(f"작업 실패 ({job['attempts']}회 시도): {job['id']}")
+
+    def complete(self, path: str, job: Dict, df: pd.DataFrame) -> bool:
+        """결과를 저장하고 작업을 완료로 이동 - 임대를 잃었으면 결과를 버림"""
+        private = self._take(path, job)
+        if private is None:
+            print(f"임대를 잃어 결과를 버립니다 (다른 워커가 다시 처리): {job['id']}")
+            return False
+
+        # 같은 작업을 다시 처리해도 같은 결과이므로 결과 파일은 덮어써도 안전
+        result_path = self._path(RESULTS, f"{job['id']}.csv")
+        tmp_path = f"{result_path}.tmp-{self.worker_id}"
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, result_path)
+
+        job['finished_by'] = self.worker_id
+        job['finished_at'] = time.time()
+        self._write_json(private, job)
+        os.rename(private, self._path(DONE, f"{job['id']}.json"))
+        return True
+
+    def is_drained(self) -> bool:
+        """대기 중이거나 처리 중인 작업이 없는지 여부"""
+        return not self._jobs(PENDING) and not self._jobs(CLAIMED)
+
+    def _run_job(self, job: Dict, readers: Dict[str, OCRReader]) -> pd.DataFrame:
+        """작업에 저장된 설정으로 동영상(구간) 처리"""
+        if tuple(job['fingerprint']) != video_fingerprint(job['video_path']):
+            raise ValueError(f"작업 등록 이후 동영상 파일이 변경되었습니다: {job['video_path']}")
+
+        config = Config()
+        for key, value in job['config'].items():
+            setattr(config, key, tuple(value) if isinstance(value, list) else value)
+
+        # OCR 엔진 로딩은 워커당 한 번만 하고 작업마다 파라미터만 적용
+        reader = readers.get(config.OCR_ENGINE)
+        if reader is None:
+            reader = readers[config.OCR_ENGINE] = OCRReader(config.OCR_ENGINE, config)
+        else:
+            reader.configure(config)
+
+        processor = VideoProcessor(job['video_path'], config, reader)
+        return processor.process_video(job['start_frame'], job['end_frame'])
+
+    def work(self, config: Optional[Config] = None) -> int:
+        """대기열이 빌 때까지 작업을 가져와 처리 - 처리한 작업 수 반환"""
+        config = config or Config()
+        readers = {}
+        processed = 0
+        print(f"워커 시작: {self.worker_id} ({self.queue_dir})")
+
+        while True:
+            self.requeue_expired()
+            claimed = self.claim()
+            if claimed is None:
+                if self.is_drained():
+                    break
+                # 다른 워커가 처리 중인 작업이 끝나거나 만료될 때까지 대기
+                time.sleep(config.WORKER_POLL_SEC)
+                continue
+
+            path, job = claimed
+            print(f"작업 시작: {job['id']} (프레임 {job['start_frame']} ~ {job['end_frame'] or '끝'})")
+            heartbeat = _Heartbeat(path, config.WORKER_HEARTBEAT_SEC)
+            try:
+                df = self._run_job(job, readers)
+            except Exception as e:
+                heartbeat.stop()
+                print(f"작업 처리 중 오류: {job['id']}: {e}")
+                if not heartbeat.lost:
+                    self.release(path, job, str(e))
+                continue
+            heartbeat.stop()
+
+            if not heartbeat.lost and self.complete(path, job, df):
+                processed += 1
+                print(f"작업 완료: {job['id']}")
+
+        print(f"대기열이 비어 워커를 종료합니다: {processed}개 작업 처리")
+        return processed
+
+    def collect(self, output_path: str) -> pd.DataFrame:
+        """완료된 작업 결과를 하나의 CSV로 합침 - 동영상마다 마지막으로 등록한 구간/설정의 결과만 사용"""
+        layouts = {}
+        for path in glob.glob(self._path(LAYOUTS, "*.json")):
+            layouts[Path(path).stem] = self._read_json(path)
+
+        frames = []
+        done = {}
+        for path in self._jobs(DONE):
+            job = self._read_json(path)
+            layout = layouts.get(job.get('video_id'))
+            if layout is not None and job.get('layout') != layout['layout']:
+                continue  # 다른 구간/설정으로 다시 등록되어 대체된 작업
+            result_path = self._path(RESULTS, f"{job['id']}.csv")
+            if not os.path.exists(result_path):
+                continue
+            df = pd.read_csv(result_path, dtype={'number_1': str, 'number_2': str})
+            df.insert(0, 'video', os.path.basename(job['video_path']))
+            frames.append(df)
+            if job.get('layout'):
+                done[job['layout']] = done.get(job['layout'], 0) + 1
+
+        for video_id, layout in layouts.items():
+            finished = done.get(layout['layout'], 0)
+            if finished < layout['segments']:
+                print(f"경고: {video_id}의 작업 {layout['segments']}개 중 {finished}개만 완료되었습니다.")
+
+        if frames:
+            merged = pd.concat(frames, ignore_index=True)
+            # 같은 프레임이 여러 작업에 들어간 경우(중복 등록 등) 한 번만 남김
+            merged = merged.drop_duplicates(['video', 'frame_index'], keep='first')
+            merged = merged.sort_values(['video', 'timestamp'], kind='stable').reset_index(drop=True)
+        else:
+            merged = pd.DataFrame(columns=['video', 'timestamp', 'frame_index', 'number_1', 'number_2'])
+
+        merged.to_csv(output_path, index=False, encoding='utf-8-sig')
+        return merged